@@ -1,2 +1,2 @@
 """App package marker"""
-__all__ = ["main", "api"]
+__all__ = ["main"]
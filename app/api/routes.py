@@ -1,8 +0,0 @@
-from fastapi import APIRouter
-
-router = APIRouter()
-
-
-@router.get("/ping")
-async def ping():
-    return {"ping": "pong"}
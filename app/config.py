@@ -6,6 +6,7 @@ load_dotenv()
 
 API_KEY = os.getenv("API_KEY", "change-me")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./gps.sqlite3")
+GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
 # SQLite needs this arg; Postgres doesn't.
 connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
@@ -0,0 +1,52 @@
+"""Request-scoped database session.
+
+Each HTTP request lazily opens one AsyncSession on first use and shares it
+across every DB access in that request; the middleware closes it after the
+response, so routes no longer pay session setup/teardown per query block.
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import AsyncSessionLocal
+
+_request_session: ContextVar[Optional[AsyncSession]] = ContextVar(
+    "req_session", default=None
+)
+
+
+def get_request_session() -> AsyncSession:
+    """Return the current request's session, creating it on first use."""
+    session = _request_session.get()
+    if session is None:
+        session = AsyncSessionLocal()
+        _request_session.set(session)
+    return session
+
+
+async def close_request_session() -> None:
+    """Close and clear the current request's session, if one was opened."""
+    session = _request_session.get()
+    if session is not None:
+        _request_session.set(None)
+        await session.close()
+
+
+class RequestSessionMiddleware:
+    """Pure ASGI middleware so the handler and the finally-block share one
+    context (BaseHTTPMiddleware would run the handler in a child context and
+    never see the session it opened)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await close_request_session()
@@ -1,16 +1,36 @@
 from fastapi import FastAPI
-from .routes import router
-from .models import init_db
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from .routes import router, gps_insert_flusher
+from .config import DATABASE_URL
+from .db import RequestSessionMiddleware
+from .models import init_db, sqlite_maintenance
 from contextlib import asynccontextmanager
+import asyncio
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
     init_db()
+    flusher_task = asyncio.create_task(gps_insert_flusher())
+    maintenance_task = None
+    if DATABASE_URL.startswith("sqlite"):
+        maintenance_task = asyncio.create_task(sqlite_maintenance())
     yield
-    # shutdown (nothing)
+    # shutdown
+    flusher_task.cancel()
+    if maintenance_task:
+        maintenance_task.cancel()
 
 
-app = FastAPI(title="Blind Stick Server", lifespan=lifespan)
+app = FastAPI(
+    title="Blind Stick Server",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+app.add_middleware(RequestSessionMiddleware)
+# GeoJSON/track payloads are highly redundant (repeated keys, ASCII numbers)
+# and shrink 5-10x under gzip; small responses are left alone.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 app.include_router(router)
\ No newline at end of file
@@ -1,25 +1,106 @@
+import asyncio
 from datetime import datetime, timezone
 from sqlalchemy import (
-    create_engine, Column, Integer, Float, String, DateTime, text, Text
+    create_engine, Column, Integer, BigInteger, Float, String, DateTime, text, Text,
+    Index, event
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from .config import DATABASE_URL, connect_args
 
+if DATABASE_URL.startswith("sqlite"):
+    # Default QueuePool: each session gets its own connection, so the request
+    # sessions, the ingest flusher and the nav-writer thread keep independent
+    # transactions (WAL lets them proceed concurrently). The connect listener
+    # below applies the PRAGMAs to every new connection.
+    pool_kwargs = {}
+else:
+    # Sized for many concurrent requests; pre-ping drops dead connections and
+    # recycle avoids stale handles in long-lived workers.
+    pool_kwargs = {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+    }
 
-engine = create_engine(DATABASE_URL, echo=False, future=True, connect_args=connect_args)
+engine = create_engine(
+    DATABASE_URL, echo=False, future=True, connect_args=connect_args, **pool_kwargs
+)
+
+# Async twin of the engine above; the route handlers await their DB round-trips
+# through this instead of blocking a threadpool thread per call.
+ASYNC_DATABASE_URL = DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://"
+).replace("sqlite:///", "sqlite+aiosqlite:///")
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, echo=False, connect_args=connect_args, **pool_kwargs
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+if DATABASE_URL.startswith("sqlite"):
+    # WAL lets readers proceed while a writer commits, and synchronous=NORMAL
+    # batches fsyncs instead of syncing every insert -- both matter for the
+    # write-heavy /receive_gps workload with concurrent /track reads.
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
 
+# gps_points timestamps are epoch milliseconds: an 8-byte integer sort key
+# compares in one instruction and keeps the composite index compact, where the
+# old ISO-text DATETIME compared long strings on every B-tree step.
+if DATABASE_URL.startswith("sqlite"):
+    _EPOCH_MS_NOW = text("(CAST(strftime('%s','now') AS INTEGER) * 1000)")
+else:
+    _EPOCH_MS_NOW = text("(EXTRACT(EPOCH FROM now()) * 1000)::bigint")
+
+
+def epoch_ms(dt: datetime) -> int:
+    """Convert an aware datetime to epoch milliseconds."""
+    return int(dt.timestamp() * 1000)
+
 
 class GPSPoint(Base):
     __tablename__ = "gps_points"
     id = Column(Integer, primary_key=True, index=True)
-    device_id = Column(String(64), index=True, nullable=False)
+    device_id = Column(String(64), nullable=False)
     lat = Column(Float, nullable=False)
     lon = Column(Float, nullable=False)
     hdop = Column(Float, nullable=True)
-    ts = Column(DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
-    created_at = Column(DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+    ts = Column(BigInteger, nullable=False, server_default=_EPOCH_MS_NOW)
+    created_at = Column(BigInteger, nullable=False, server_default=_EPOCH_MS_NOW)
+
+    # Composite index matching the ORDER BY of /latest, /track and /geojson so
+    # those queries become an index range scan + LIMIT instead of scan + sort.
+    __table_args__ = (
+        Index("ix_gps_points_device_ts", device_id, ts.desc(), id.desc()),
+    )
+
+
+class GeocodeCache(Base):
+    """Geocoding results keyed by normalized place name.
+
+    Repeat destinations skip the paid Geocoding API round-trip; entries are
+    refreshed after a TTL (see app.services) via INSERT OR REPLACE semantics.
+    """
+    __tablename__ = "geocode_cache"
+    place = Column(String(512), primary_key=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    formatted_address = Column(String(512), nullable=True)
+    ts = Column(BigInteger, nullable=False)  # epoch ms of the API lookup
 
 
 class NavigationRequest(Base):
@@ -41,3 +122,38 @@ class NavigationRequest(Base):
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all only creates missing tables, so upgrade pre-existing DB files
+    # that still carry the old single-column device_id index.
+    with engine.begin() as conn:
+        if DATABASE_URL.startswith("sqlite"):
+            # Rewrite ISO-text timestamps from pre-epoch-ms DB files in place;
+            # SQLite's dynamic typing makes this a plain UPDATE.
+            for col in ("ts", "created_at"):
+                conn.exec_driver_sql(
+                    f"UPDATE gps_points SET {col} = "
+                    f"CAST(strftime('%s', {col}) AS INTEGER) * 1000 "
+                    f"WHERE typeof({col}) = 'text'"
+                )
+        conn.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_gps_points_device_ts "
+            "ON gps_points (device_id, ts DESC, id DESC)"
+        )
+        if DATABASE_URL.startswith("sqlite"):
+            # Fresh statistics keep the planner on the composite index as the
+            # table grows (Postgres autovacuum handles this on its own).
+            conn.exec_driver_sql("ANALYZE")
+            conn.exec_driver_sql("PRAGMA optimize")
+
+
+async def sqlite_maintenance(interval: float = 600.0):
+    """Periodically checkpoint the WAL and refresh planner statistics.
+
+    Runs as a lifespan background task for SQLite deployments; without it the
+    -wal file grows unboundedly under sustained ingest and the planner's row
+    estimates drift.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        async with async_engine.begin() as conn:
+            await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+            await conn.exec_driver_sql("PRAGMA optimize")
@@ -1,13 +1,24 @@
 from fastapi import APIRouter, Header, HTTPException, Query, File, UploadFile, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from typing import Optional, List
 from datetime import datetime, timezone
+import asyncio
+import gzip
+import hashlib
+
+from fastapi.concurrency import run_in_threadpool
+from cachetools import LRUCache, TTLCache
+from pydantic import TypeAdapter
 import time
 import os
 
-from .models import SessionLocal, GPSPoint, init_db
+import orjson
+from sqlalchemy import select, insert, bindparam, func, lambda_stmt
+
+from .db import get_request_session
+from .models import SessionLocal, AsyncSessionLocal, GPSPoint, init_db, epoch_ms
 from .schemas import GPSIn, GPSOut, NavigationResponse, NavigationStep
 from .services import (
     transcribe_audio,
@@ -15,14 +26,112 @@ from .services import (
     extract_place_name,
     geocode_place,
     get_directions,
-    save_audio_file,
+    save_audio_file_async,
     store_navigation_request
 )
-from .config import API_KEY
+from .config import API_KEY, GOOGLE_MAPS_API_KEY
 
 router = APIRouter()
 templates = Jinja2Templates(directory="web/templates")
 
+# Dashboards poll /latest and /track far faster than GPS points arrive (1 Hz),
+# so a sub-second TTL collapses a poll storm into one DB round-trip without
+# serving stale fixes for longer than half a tick.
+_latest_cache: TTLCache = TTLCache(maxsize=1024, ttl=0.5)
+_track_cache: TTLCache = TTLCache(maxsize=1024, ttl=0.5)
+
+# Validates a whole row list in one pydantic-core pass instead of calling the
+# GPSOut constructor per row.
+_gps_list_adapter = TypeAdapter(List[GPSOut])
+
+# Built once at import; per-request execution skips clause-tree construction
+# and SQL compilation (lambda_stmt caches by lambda, treating the closed-over
+# device_id/limit as bound parameters).
+# Column projection rather than the mapped entity: a Row named tuple skips
+# ORM instance construction and identity-map bookkeeping for the single row.
+_latest_stmt = (
+    select(
+        GPSPoint.id,
+        GPSPoint.device_id,
+        GPSPoint.lat,
+        GPSPoint.lon,
+        GPSPoint.hdop,
+        GPSPoint.ts,
+        GPSPoint.created_at,
+    )
+    .where(GPSPoint.device_id == bindparam("dev"))
+    .order_by(GPSPoint.ts.desc(), GPSPoint.id.desc())
+    .limit(1)
+)
+_max_id_stmt = select(func.max(GPSPoint.id)).where(
+    GPSPoint.device_id == bindparam("dev")
+)
+
+# Serialized FeatureCollections keyed by (device_id, limit); a new insert for
+# the device bumps MAX(id), which implicitly invalidates the entry. LRU-bounded
+# so entries for retired devices/limits are eventually evicted.
+_geojson_cache: LRUCache = LRUCache(maxsize=256)
+
+# /receive_gps ingest buffer: requests enqueue (row, future) pairs and the
+# lifespan-spawned flusher commits them in one multi-row INSERT, so the
+# transaction/fsync cost is amortized across every request that arrived in
+# the same window.
+_ingest_queue: asyncio.Queue = asyncio.Queue()
+
+_INGEST_BATCH_SIZE = 100
+_INGEST_FLUSH_INTERVAL = 0.2  # seconds; upper bound, only reached under load
+
+
+async def gps_insert_flusher():
+    """Drain the ingest queue in batches and resolve each request's id.
+
+    An isolated request flushes immediately; the window only stretches while
+    more producers keep the queue non-empty, so batching never adds latency
+    without concurrency to amortize it.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _ingest_queue.get()]
+        deadline = loop.time() + _INGEST_FLUSH_INTERVAL
+        while len(batch) < _INGEST_BATCH_SIZE and loop.time() < deadline:
+            try:
+                while len(batch) < _INGEST_BATCH_SIZE:
+                    batch.append(_ingest_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                pass
+            if len(batch) >= _INGEST_BATCH_SIZE:
+                break
+            # Yield once so producers already scheduled this loop iteration
+            # can enqueue; if none do, commit now instead of waiting out the
+            # flush window.
+            await asyncio.sleep(0)
+            if _ingest_queue.empty():
+                break
+        rows = [row for row, _ in batch]
+        try:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    insert(GPSPoint).returning(
+                        GPSPoint.id, sort_by_parameter_order=True
+                    ),
+                    rows,
+                )
+                ids = [r[0] for r in result]
+                await db.commit()
+            for (_, fut), new_id in zip(batch, ids):
+                if not fut.done():
+                    fut.set_result(new_id)
+        except Exception as exc:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+
+
+def _invalidate_device_cache(device_id: str):
+    _latest_cache.pop(device_id, None)
+    for key in [k for k in _track_cache if k[0] == device_id]:
+        _track_cache.pop(key, None)
+
 
 def _auth_or_401(x_api_key: Optional[str]):
     if x_api_key != API_KEY:
@@ -40,100 +149,170 @@ def root():
 
 
 @router.post("/receive_gps", response_model=dict)
-def receive_gps(data: GPSIn, x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
+async def receive_gps(data: GPSIn, x_api_key: Optional[str] = Header(None, alias="X-API-Key")):
     _auth_or_401(x_api_key)
-    with SessionLocal() as db:
-        point = GPSPoint(
-            device_id=data.device_id,
-            lat=float(data.lat),
-            lon=float(data.lon),
-            hdop=float(data.hdop) if data.hdop is not None else None,
-            ts=datetime.now(timezone.utc),
-        )
-        db.add(point)
-        db.commit()
-        db.refresh(point)
-    return JSONResponse(status_code=201, content={"ok": True, "id": point.id})
+    now_ms = epoch_ms(datetime.now(timezone.utc))
+    row = {
+        "device_id": data.device_id,
+        "lat": float(data.lat),
+        "lon": float(data.lon),
+        "hdop": float(data.hdop) if data.hdop is not None else None,
+        "ts": epoch_ms(data.ts) if data.ts else now_ms,
+        "created_at": now_ms,
+    }
+    fut = asyncio.get_running_loop().create_future()
+    _ingest_queue.put_nowait((row, fut))
+    new_id = await fut
+    _invalidate_device_cache(data.device_id)
+    return ORJSONResponse(status_code=201, content={"ok": True, "id": new_id})
+
+
+@router.post("/receive_gps_batch", response_model=dict)
+async def receive_gps_batch(
+    data: List[GPSIn], x_api_key: Optional[str] = Header(None, alias="X-API-Key")
+):
+    """Ingest many GPS points in one request.
+
+    A single Core multi-row INSERT inside one transaction, so the commit/fsync
+    cost is paid once per batch instead of once per point.
+    """
+    _auth_or_401(x_api_key)
+    if not data:
+        return ORJSONResponse(status_code=201, content={"ok": True, "inserted": 0})
+    now_ms = epoch_ms(datetime.now(timezone.utc))
+    rows = [
+        {
+            "device_id": p.device_id,
+            "lat": float(p.lat),
+            "lon": float(p.lon),
+            "hdop": float(p.hdop) if p.hdop is not None else None,
+            "ts": epoch_ms(p.ts) if p.ts else now_ms,
+            "created_at": now_ms,
+        }
+        for p in data
+    ]
+    db = get_request_session()
+    await db.execute(insert(GPSPoint), rows)
+    await db.commit()
+    for device_id in {r["device_id"] for r in rows}:
+        _invalidate_device_cache(device_id)
+    return ORJSONResponse(status_code=201, content={"ok": True, "inserted": len(rows)})
 
 
 @router.get("/latest", response_model=GPSOut)
-def latest(device_id: str = Query(..., description="Device ID")):
-    with SessionLocal() as db:
-        row = (
-            db.query(GPSPoint)
-            .filter(GPSPoint.device_id == device_id)
-            .order_by(GPSPoint.ts.desc(), GPSPoint.id.desc())
-            .first()
-        )
-        if not row:
-            raise HTTPException(status_code=404, detail="No data for device_id")
-        return GPSOut(
-            id=row.id,
-            device_id=row.device_id,
-            lat=row.lat,
-            lon=row.lon,
-            hdop=row.hdop,
-            ts=row.ts,
-            created_at=row.created_at,
-        )
+async def latest(device_id: str = Query(..., description="Device ID")):
+    cached = _latest_cache.get(device_id)
+    if cached is not None:
+        return cached
+    db = get_request_session()
+    result = await db.execute(_latest_stmt, {"dev": device_id})
+    row = result.first()
+    if not row:
+        raise HTTPException(status_code=404, detail="No data for device_id")
+    out = GPSOut.model_validate(row)
+    _latest_cache[device_id] = out
+    return out
 
 
 @router.get("/track", response_model=List[GPSOut])
-def track(device_id: str = Query(...), limit: int = Query(100, ge=1, le=1000)):
-    with SessionLocal() as db:
-        rows = (
-            db.query(GPSPoint)
-            .filter(GPSPoint.device_id == device_id)
-            .order_by(GPSPoint.ts.desc(), GPSPoint.id.desc())
-            .limit(limit)
-            .all()
-        )
-        return [
-            GPSOut(
-                id=r.id,
-                device_id=r.device_id,
-                lat=r.lat,
-                lon=r.lon,
-                hdop=r.hdop,
-                ts=r.ts,
-                created_at=r.created_at,
-            )
-            for r in rows
-        ]
+async def track(device_id: str = Query(...), limit: int = Query(100, ge=1, le=1000)):
+    cached = _track_cache.get((device_id, limit))
+    if cached is not None:
+        return cached
+    db = get_request_session()
+    stmt = lambda_stmt(
+        lambda: select(GPSPoint)
+        .where(GPSPoint.device_id == device_id)
+        .order_by(GPSPoint.ts.desc(), GPSPoint.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    rows = result.scalars().all()
+    out = _gps_list_adapter.validate_python(rows, from_attributes=True)
+    _track_cache[(device_id, limit)] = out
+    return out
 
 
 @router.get("/geojson")
-def geojson(device_id: str = Query(...), limit: int = Query(100, ge=1, le=2000)):
-    with SessionLocal() as db:
-        rows = (
-            db.query(GPSPoint)
-            .filter(GPSPoint.device_id == device_id)
-            .order_by(GPSPoint.ts.desc(), GPSPoint.id.desc())
-            .limit(limit)
-            .all()
+async def geojson(device_id: str = Query(...), limit: int = Query(100, ge=1, le=2000)):
+    # Core column projection: no ORM instance per row, and orjson serializes
+    # the datetime values natively (no per-row .isoformat()).
+    db = get_request_session()
+    # MAX(id) is a cheap probe via the composite index and doubles as the
+    # cache validity token for the serialized payload.
+    max_id = (await db.execute(_max_id_stmt, {"dev": device_id})).scalar()
+    key = (device_id, limit)
+    cached = _geojson_cache.get(key)
+    if cached is not None and cached[0] == max_id:
+        return Response(content=cached[1], media_type="application/json")
+    stmt = lambda_stmt(
+        lambda: select(
+            GPSPoint.id,
+            GPSPoint.device_id,
+            GPSPoint.lat,
+            GPSPoint.lon,
+            GPSPoint.hdop,
+            GPSPoint.ts,
         )
-    features = []
-    for r in reversed(rows):
-        features.append({
+        .where(GPSPoint.device_id == device_id)
+        .order_by(GPSPoint.ts.desc(), GPSPoint.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    rows = result.all()
+    features = [
+        {
             "type": "Feature",
             "properties": {
                 "id": r.id,
                 "device_id": r.device_id,
                 "hdop": r.hdop,
-                "ts": r.ts.isoformat(),
+                "ts": r.ts,
             },
             "geometry": {"type": "Point", "coordinates": [r.lon, r.lat]},
-        })
-    return JSONResponse({"type": "FeatureCollection", "features": features})
+        }
+        for r in reversed(rows)
+    ]
+    payload = orjson.dumps({"type": "FeatureCollection", "features": features})
+    _geojson_cache[key] = (max_id, payload)
+    return Response(content=payload, media_type="application/json")
 
 
-# Reuse the existing HTML map from previous main; keep it simple here
-LEAFLET_HTML = """(leaflet omitted for brevity)"""
+# The map page is static for a given default device, so render, encode and
+# gzip it once instead of re-running Jinja and the encoder per hit. Rendered
+# lazily so importing this module never requires the template on disk.
+_map_page_cache: Optional[tuple] = None
+
+
+def _map_page_payload():
+    global _map_page_cache
+    if _map_page_cache is None:
+        raw = (
+            templates.get_template("map.html")
+            .render(default_device="esp32-1")
+            .encode("utf-8")
+        )
+        etag = hashlib.md5(raw).hexdigest()[:16]
+        _map_page_cache = (etag, raw, gzip.compress(raw, 6))
+    return _map_page_cache
 
 
 @router.get("/map", response_class=HTMLResponse)
 def map_page(request: Request):
-    return templates.TemplateResponse("map.html", {"request": request, "default_device": "esp32-1"})
+    etag, raw, gzipped = _map_page_payload()
+    # Vary tells shared caches the body is negotiated on Accept-Encoding; the
+    # 304 echoes the validator/caching headers per RFC 9110.
+    headers = {
+        "Cache-Control": "public, max-age=3600",
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=gzipped, media_type="text/html", headers=headers)
+    return Response(content=raw, media_type="text/html", headers=headers)
 
 
 @router.get('/voice', response_class=HTMLResponse)
@@ -164,9 +343,9 @@ async def navigate(
     7. Return navigation payload (polyline, steps, waypoints)
     """
     _auth_or_401(x_api_key)
-    
-    # Get Google Maps API key from environment
-    gmaps_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+
+    # Key is read once at import in app.config, not per request
+    gmaps_api_key = GOOGLE_MAPS_API_KEY
     if not gmaps_api_key:
         return NavigationResponse(
             success=False,
@@ -174,15 +353,21 @@ async def navigate(
             error="Google Maps API key not configured. Set GOOGLE_MAPS_API_KEY in .env"
         )
     
-    # Read audio content
+    # Read audio content for STT, then rewind so the save path can stream the
+    # spooled upload straight to disk instead of a second in-memory copy
     audio_content = await audio.read()
-    
-    # Save audio file
+    await audio.seek(0)
+
+    # Saving to disk and transcribing are independent, so run them
+    # concurrently instead of paying for the disk write before the STT call
     audio_filename = f"nav_{device_id}_{int(time.time())}.webm"
-    audio_path = save_audio_file(audio_content, audio_filename)
-    
-    # Step 1: Transcribe audio
-    transcript, detected_lang = transcribe_audio(audio_content)
+    save_task = asyncio.create_task(
+        save_audio_file_async(audio.file, audio_filename)
+    )
+    transcript, detected_lang = await run_in_threadpool(
+        transcribe_audio, audio_content, audio.filename
+    )
+    audio_path = await save_task
     if not transcript:
         return NavigationResponse(
             success=False,
@@ -190,9 +375,16 @@ async def navigate(
             error="Could not transcribe audio. Ensure Google Cloud Speech-to-Text is configured."
         )
     
-    # Step 2: Translate to English if needed
-    translated_text, source_lang = translate_to_english(transcript, detected_lang)
-    
+    # Step 2: Translate to English if needed. When STT already reports an
+    # English language code, skip the translate service entirely -- no
+    # threadpool hop and no Translate client construction on the common path.
+    if detected_lang and detected_lang.lower().startswith("en"):
+        translated_text, source_lang = transcript, detected_lang
+    else:
+        translated_text, source_lang = await run_in_threadpool(
+            translate_to_english, transcript, detected_lang
+        )
+
     # Step 3: Extract place name
     place_name = extract_place_name(translated_text)
     if not place_name:
@@ -205,7 +397,7 @@ async def navigate(
         )
     
     # Step 4: Geocode place to get destination coordinates
-    geocode_result = geocode_place(place_name, gmaps_api_key)
+    geocode_result = await run_in_threadpool(geocode_place, place_name, gmaps_api_key)
     if not geocode_result:
         return NavigationResponse(
             success=False,
@@ -221,7 +413,9 @@ async def navigate(
     dest_address = geocode_result['formatted_address']
     
     # Step 5: Get directions
-    directions = get_directions(lat, lng, dest_lat, dest_lng, gmaps_api_key)
+    directions = await run_in_threadpool(
+        get_directions, lat, lng, dest_lat, dest_lng, gmaps_api_key
+    )
     if not directions:
         return NavigationResponse(
             success=False,
@@ -234,8 +428,9 @@ async def navigate(
             error="Could not retrieve directions."
         )
     
-    # Step 6: Store request in database
-    nav_request = store_navigation_request(
+    # Step 6: Store request in database, overlapping with response assembly
+    store_task = asyncio.create_task(run_in_threadpool(
+        store_navigation_request,
         device_id=device_id,
         origin_lat=lat,
         origin_lng=lng,
@@ -247,8 +442,8 @@ async def navigate(
         destination_lat=dest_lat,
         destination_lng=dest_lng,
         audio_path=audio_path
-    )
-    
+    ))
+
     # Step 7: Build navigation response
     steps = [
         NavigationStep(
@@ -259,10 +454,12 @@ async def navigate(
         )
         for s in directions['steps']
     ]
-    
+    nav_request = await store_task
+
     return NavigationResponse(
         success=True,
-        request_id=nav_request.id,
+        # id is assigned by the background writer; 0 when not yet committed
+        request_id=nav_request.id or 0,
         transcript=transcript,
         detected_language=source_lang,
         destination_place=dest_address,
@@ -271,5 +468,6 @@ async def navigate(
         distance_text=directions['distance'],
         duration_text=directions['duration'],
         overview_polyline=directions['polyline'],
+        overview_polyline_bin=directions.get('polyline_bin'),
         steps=steps
     )
@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import AwareDatetime, BaseModel, ConfigDict, Field, field_validator
 from typing import Annotated
 
 
@@ -8,11 +8,13 @@ class GPSIn(BaseModel):
     lat: Annotated[float, Field(..., ge=-90, le=90, description="Latitude")]
     lon: Annotated[float, Field(..., ge=-180, le=180, description="Longitude")]
     hdop: Optional[float] = Field(None, description="Horizontal dilution of precision")
-    ts: Optional[str] = Field(None, description="ISO 8601 timestamp from device")
+    ts: Optional[AwareDatetime] = Field(None, description="ISO 8601 timestamp from device")
     device_id: str = Field("esp32-1", description="Device identifier")
 
 
 class GPSOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     device_id: str
     lat: float
@@ -21,6 +23,14 @@ class GPSOut(BaseModel):
     ts: datetime
     created_at: datetime
 
+    @field_validator("ts", "created_at", mode="before")
+    @classmethod
+    def _epoch_ms_to_datetime(cls, v):
+        # gps_points stores timestamps as epoch milliseconds
+        if isinstance(v, int):
+            return datetime.fromtimestamp(v / 1000, tz=timezone.utc)
+        return v
+
 
 class NavigationStep(BaseModel):
     """Single navigation step (turn-by-turn instruction)"""
@@ -42,5 +52,6 @@ class NavigationResponse(BaseModel):
     distance_text: Optional[str] = None  # total distance e.g., "5.2 km"
     duration_text: Optional[str] = None  # total duration e.g., "15 mins"
     overview_polyline: Optional[str] = None  # encoded polyline
+    overview_polyline_bin: Optional[str] = None  # base64 int32 pairs, 1e7-scaled
     steps: List[NavigationStep] = []
     error: Optional[str] = None
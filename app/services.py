@@ -8,13 +8,31 @@ Provides voice-to-navigation pipeline:
 - Directions (Google Maps)
 """
 
+import base64
+import functools
+import html
+import logging
 import re
+import struct
 import os
-from typing import Optional, Tuple, List, Dict, Any
+import shutil
+import threading
+
+import aiofiles
+import time
+import unicodedata
+from dataclasses import dataclass
+from queue import Queue, Empty
+from cachetools import TTLCache
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from typing import Optional, Tuple, List, Dict, Any, BinaryIO
 from pathlib import Path
-from .models import SessionLocal, NavigationRequest
+from .models import SessionLocal, GeocodeCache, NavigationRequest, epoch_ms
 from .schemas import NavigationStep
 
+logger = logging.getLogger(__name__)
+
 # Setup uploads directory
 UPLOAD_DIR = Path(__file__).resolve().parents[1] / 'web' / 'uploads'
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -34,23 +52,122 @@ try:
 except Exception:
     GOOGLE_MAPS_AVAILABLE = False
 
+# Polyline codec for the binary route format
+try:
+    import polyline as polyline_codec
+    POLYLINE_AVAILABLE = True
+except Exception:
+    POLYLINE_AVAILABLE = False
+
+# Client construction is expensive relative to the short calls made through
+# them (TLS handshakes for requests-based googlemaps, gRPC channel setup for
+# the Cloud SDKs), so each client is built once and reused.
+_client_lock = threading.Lock()
+_speech_client = None
+_translate_client = None
+
+
+@functools.lru_cache(maxsize=4)
+def _gmaps_client(api_key: str):
+    return googlemaps.Client(key=api_key)
+
+
+def _get_speech_client():
+    global _speech_client
+    if _speech_client is None:
+        with _client_lock:
+            if _speech_client is None:
+                _speech_client = speech.SpeechClient()
+    return _speech_client
+
+
+def _get_translate_client():
+    global _translate_client
+    if _translate_client is None:
+        with _client_lock:
+            if _translate_client is None:
+                _translate_client = translate.Client()
+    return _translate_client
+
 
-def transcribe_audio(audio_content: bytes) -> Tuple[Optional[str], Optional[str]]:
+# Known container formats by file extension; telling Google the codec and
+# sample rate up front skips server-side format sniffing.
+_AUDIO_ENCODINGS = {
+    'webm': ('WEBM_OPUS', 48000),
+    'ogg': ('OGG_OPUS', 48000),
+    'wav': ('LINEAR16', None),
+    'flac': ('FLAC', None),
+}
+
+# Container magic bytes; more reliable than the upload's file extension and
+# free to check, since the whole payload is already in memory.
+_AUDIO_MAGIC = {
+    b'\x1aE\xdf\xa3': 'webm',  # EBML header (WebM/Matroska)
+    b'OggS': 'ogg',
+    b'RIFF': 'wav',
+    b'fLaC': 'flac',
+}
+
+# Anything below ~1 KiB is too short to hold real speech and anything above
+# 10 MB is not a voice command; both would still cost a full (paid) STT
+# round-trip if sent.
+_MIN_AUDIO_BYTES = 1024
+_MAX_AUDIO_BYTES = 10_000_000
+
+# Primary + alternates instead of server-side open-ended detection; tuned for
+# the deployment region (English UI, Bangla/Hindi speakers).
+_STT_LANGUAGE = "en-US"
+_STT_ALT_LANGUAGES = ["bn-BD", "hi-IN"]
+
+
+def transcribe_audio(
+    audio_content: bytes, filename: Optional[str] = None
+) -> Tuple[Optional[str], Optional[str]]:
     """
     Transcribe audio using Google Speech-to-Text.
+    Obviously-bad payloads (empty, too short, too long) are rejected before
+    the API call; when the magic bytes or filename pin down the codec, the
+    encoding/sample rate are set explicitly so the server skips format
+    sniffing.
     Returns (transcript, detected_language_code) or (None, None) if unavailable.
     """
     if not GOOGLE_CLOUD_AVAILABLE:
         return (None, None)
-    
+
+    if not audio_content or not (
+        _MIN_AUDIO_BYTES <= len(audio_content) <= _MAX_AUDIO_BYTES
+    ):
+        return (None, None)
+
     try:
-        client = speech.SpeechClient()
+        client = _get_speech_client()
         audio = speech.RecognitionAudio(content=audio_content)
-        config = speech.RecognitionConfig(
+        config_kwargs: Dict[str, Any] = dict(
             encoding=speech.RecognitionConfig.AudioEncoding.ENCODING_UNSPECIFIED,
-            language_code="auto",
+            language_code=_STT_LANGUAGE,
+            alternative_language_codes=_STT_ALT_LANGUAGES,
             enable_automatic_punctuation=True,
+            # Short navigation commands: the command model answers much
+            # faster than the default long-form one
+            model="command_and_search",
         )
+        # Magic bytes beat the filename extension when they disagree
+        ext = next(
+            (fmt for magic, fmt in _AUDIO_MAGIC.items()
+             if audio_content.startswith(magic)),
+            None,
+        )
+        if ext is None and filename and '.' in filename:
+            ext = filename.rsplit('.', 1)[-1].lower()
+        known = _AUDIO_ENCODINGS.get(ext)
+        if known:
+            encoding_name, sample_rate = known
+            config_kwargs["encoding"] = getattr(
+                speech.RecognitionConfig.AudioEncoding, encoding_name
+            )
+            if sample_rate:
+                config_kwargs["sample_rate_hertz"] = sample_rate
+        config = speech.RecognitionConfig(**config_kwargs)
         response = client.recognize(config=config, audio=audio)
         
         if response.results:
@@ -59,8 +176,8 @@ def transcribe_audio(audio_content: bytes) -> Tuple[Optional[str], Optional[str]
             lang_code = response.results[0].language_code if response.results else None
             return (transcript, lang_code)
         return (None, None)
-    except Exception as e:
-        print(f"Speech-to-Text error: {e}")
+    except Exception:
+        logger.exception("Speech-to-Text error")
         return (None, None)
 
 
@@ -73,82 +190,220 @@ def translate_to_english(text: str, source_lang: Optional[str] = None) -> Tuple[
         return (text, None)
     
     try:
-        client = translate.Client()
-        
-        # Detect language if not provided
-        if not source_lang:
-            detection = client.detect_language(text)
-            source_lang = detection.get("language")
-        
-        # Skip translation if already English
+        client = _get_translate_client()
+
+        # Skip translation if the caller already knows it's English
         if source_lang and source_lang.lower().startswith("en"):
             return (text, source_lang)
-        
-        # Translate to English
-        result = client.translate(text, target_language="en", source_language=source_lang)
+
+        # One call: translate() detects the source language itself when none
+        # is given, so the separate detect_language round-trip is unnecessary
+        result = client.translate(
+            text, target_language="en", source_language=source_lang or None
+        )
         translated = result.get("translatedText", text)
-        return (translated, source_lang)
-    except Exception as e:
-        print(f"Translation error: {e}")
+        detected = source_lang or result.get("detectedSourceLanguage")
+        return (translated, detected)
+    except Exception:
+        logger.exception("Translation error")
         return (text, None)
 
 
+# All navigation triggers fused into one alternation (grouped by shared
+# prefix, most frequent first) so the input is scanned once instead of up to
+# three times; compiled at import, IGNORECASE instead of lowering the input.
+_NAV_RE = re.compile(
+    r"(?:take me to|go to|navigate to|direction to|find|show me|where is"
+    r"|how (?:do i get to|to reach)|route to|i (?:want|need) to go to)\s+(.+)",
+    re.IGNORECASE,
+)
+_TRAIL_PUNCT = re.compile(r'[?.!,]+$')
+
+# The triggers are all fixed strings, so an Aho-Corasick automaton finds the
+# match in one linear pass over the input where the regex NFA walks
+# alternation branches; the regex stays as fallback when the C extension is
+# not installed.
+_NAV_PREFIXES = (
+    "take me to", "go to", "navigate to", "direction to", "find", "show me",
+    "where is", "how do i get to", "how to reach", "route to",
+    "i want to go to", "i need to go to",
+)
+
+# Most commands simply start with a trigger, which a C-level startswith
+# catches without touching the automaton or regex; longest first so
+# overlapping triggers resolve correctly.
+_NAV_PREFIX_TUPLE = tuple(
+    p + " " for p in sorted(_NAV_PREFIXES, key=len, reverse=True)
+)
+
+try:
+    import ahocorasick
+    _NAV_AUTOMATON = ahocorasick.Automaton()
+    for _p in _NAV_PREFIXES:
+        _NAV_AUTOMATON.add_word(_p, len(_p))
+    _NAV_AUTOMATON.make_automaton()
+except Exception:
+    _NAV_AUTOMATON = None
+
+
 def extract_place_name(text: str) -> Optional[str]:
     """
     Extract place/destination name from English text using simple NLP heuristics.
     Looks for patterns like "take me to X", "go to X", "navigate to X", etc.
     Returns extracted place name or the full text as fallback.
     """
+    # Strip once up front; every path below works on the same string, and the
+    # extracted place keeps its original casing (Google geocodes cased names
+    # better than lowercased ones).
+    text = text.strip()
     if not text:
         return None
-    
-    text_lower = text.lower().strip()
-    
-    # Common navigation patterns
-    patterns = [
-        r"(?:take me to|go to|navigate to|direction to|find|show me|where is)\s+(.+)",
-        r"(?:how do i get to|how to reach|route to)\s+(.+)",
-        r"(?:i want to go to|i need to go to)\s+(.+)",
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text_lower)
+
+    lower = text.lower()
+
+    # Fast path: command begins with a trigger (the common case)
+    for prefix in _NAV_PREFIX_TUPLE:
+        if lower.startswith(prefix):
+            place = text[len(prefix):].strip()
+            return _TRAIL_PUNCT.sub('', place)
+
+    if _NAV_AUTOMATON is not None:
+        best = None  # (start, length, end) of earliest, longest trigger
+        for end, length in _NAV_AUTOMATON.iter(lower):
+            start = end - length + 1
+            # Triggers only count on word boundaries with a place following
+            if (start == 0 or lower[start - 1].isspace()) \
+                    and end + 1 < len(lower) and lower[end + 1].isspace():
+                if best is None or start < best[0] \
+                        or (start == best[0] and length > best[1]):
+                    best = (start, length, end)
+        if best:
+            place = text[best[2] + 1:].strip()
+            return _TRAIL_PUNCT.sub('', place)
+    else:
+        match = _NAV_RE.search(text)
         if match:
             place = match.group(1).strip()
             # Clean up trailing punctuation
-            place = re.sub(r'[?.!,]+$', '', place)
-            return place
-    
+            return _TRAIL_PUNCT.sub('', place)
+
     # If no pattern matched, return the full text (user might just say place name)
-    return text.strip()
+    return text
+
+
+# Repeat destinations ("take me home" class of commands) are common, so
+# successful geocodes are kept in the DB for a month before re-querying.
+_GEOCODE_TTL_MS = 30 * 24 * 3600 * 1000
+
+
+def _normalize_place(name: str) -> str:
+    """Normalize a place name into a stable cache key: NFKC-folded and
+    casefolded, whitespace collapsed, trailing punctuation dropped.
+    Non-Latin scripts (Bangla/Hindi destinations) pass through intact."""
+    name = unicodedata.normalize('NFKC', name)
+    name = _TRAIL_PUNCT.sub('', name.strip())
+    return ' '.join(name.casefold().split())
 
 
 def geocode_place(place_name: str, gmaps_api_key: str) -> Optional[Dict[str, Any]]:
     """
     Geocode a place name using Google Maps Places/Geocoding API.
+    Results are cached persistently by normalized place name, so repeated
+    destinations never leave the local DB.
     Returns dict with 'lat', 'lng', 'formatted_address' or None if not found.
     """
-    if not GOOGLE_MAPS_AVAILABLE or not place_name:
+    if not place_name:
         return None
-    
+
+    # An empty key (all-punctuation input) would collide every such request
+    # on one cache row, so those skip the cache entirely.
+    key = _normalize_place(place_name)
+    now_ms = epoch_ms(datetime.now(timezone.utc))
+    if key:
+        try:
+            with SessionLocal() as db:
+                cached = db.get(GeocodeCache, key)
+                if cached and now_ms - cached.ts < _GEOCODE_TTL_MS:
+                    return {
+                        'lat': cached.lat,
+                        'lng': cached.lng,
+                        'formatted_address': cached.formatted_address or place_name,
+                    }
+        except Exception:
+            logger.exception("Geocode cache error")
+
+    if not GOOGLE_MAPS_AVAILABLE:
+        return None
+
     try:
-        gmaps = googlemaps.Client(key=gmaps_api_key)
-        
+        gmaps = _gmaps_client(gmaps_api_key)
+
         # Try geocoding first (handles addresses and place names)
         results = gmaps.geocode(place_name)
-        
+
         if results:
             location = results[0]['geometry']['location']
-            return {
+            result = {
                 'lat': location['lat'],
                 'lng': location['lng'],
                 'formatted_address': results[0].get('formatted_address', place_name)
             }
-        
+            if key:
+                try:
+                    with SessionLocal() as db:
+                        db.merge(GeocodeCache(
+                            place=key,
+                            lat=result['lat'],
+                            lng=result['lng'],
+                            formatted_address=result['formatted_address'],
+                            ts=now_ms,
+                        ))
+                        db.commit()
+                except Exception:
+                    logger.exception("Geocode cache error")
+            return result
+
+        return None
+    except Exception:
+        logger.exception("Geocoding error")
         return None
-    except Exception as e:
-        print(f"Geocoding error: {e}")
+
+
+# Google's html_instructions embed <b>/<div> markup and entities; stripping
+# once server-side saves every device the markup bytes and the parsing.
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+
+def _strip_html(instruction: str) -> str:
+    """Reduce an html_instructions string to plain text."""
+    return _WS_RE.sub(
+        ' ', html.unescape(_HTML_TAG_RE.sub(' ', instruction))
+    ).strip()
+
+
+# A walking route barely changes while the user's GPS fix jitters by meters,
+# so results are cached with the origin quantized to ~10 m (4 decimal
+# places); a 10-minute TTL still picks up closures/traffic eventually.
+# Lock-guarded because get_directions runs in threadpool workers.
+_directions_cache: TTLCache = TTLCache(maxsize=1024, ttl=600)
+_directions_cache_lock = threading.Lock()
+
+
+def _pack_polyline(encoded: str) -> Optional[str]:
+    """Decode Google's ASCII polyline once and re-pack as base64-wrapped
+    little-endian int32 pairs scaled by 1e7.
+
+    Fixed 8 bytes/point vs ~11 for the ASCII format, and the firmware reads
+    the coordinates directly instead of implementing the varint decoder.
+    """
+    if not POLYLINE_AVAILABLE:
         return None
+    pts = polyline_codec.decode(encoded)
+    packed = struct.pack(
+        f'<{len(pts) * 2}i', *(int(v * 1e7) for p in pts for v in p)
+    )
+    return base64.b64encode(packed).decode('ascii')
 
 
 def get_directions(
@@ -160,14 +415,24 @@ def get_directions(
 ) -> Optional[Dict[str, Any]]:
     """
     Get turn-by-turn directions from origin to destination using Google Maps Directions API.
+    Repeat requests from (almost) the same origin to the same destination are
+    served from a short-lived cache instead of the paid API.
     Returns dict with 'polyline', 'distance', 'duration', 'steps' or None if failed.
     """
     if not GOOGLE_MAPS_AVAILABLE:
         return None
-    
+
+    cache_key = (
+        round(origin_lat, 4), round(origin_lng, 4), dest_lat, dest_lng, "walking"
+    )
+    with _directions_cache_lock:
+        cached = _directions_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        gmaps = googlemaps.Client(key=gmaps_api_key)
-        
+        gmaps = _gmaps_client(gmaps_api_key)
+
         # Request directions (walking mode for blind stick)
         result = gmaps.directions(
             origin=(origin_lat, origin_lng),
@@ -182,35 +447,112 @@ def get_directions(
         route = result[0]
         leg = route['legs'][0]
         
-        # Extract steps
-        steps = []
-        for step in leg['steps']:
-            steps.append({
-                'instruction': step['html_instructions'],
-                'distance': step['distance']['text'],
-                'duration': step['duration']['text'],
-                'maneuver': step.get('maneuver', None)
-            })
+        # Extract steps; locals bound once so the comprehension avoids
+        # repeated global/attribute lookups per step
+        leg_steps = leg['steps']
+        strip_html = _strip_html
+        steps = [
+            {
+                'instruction': strip_html(s['html_instructions']),
+                'distance': s['distance']['text'],
+                'duration': s['duration']['text'],
+                'maneuver': s.get('maneuver', None)
+            }
+            for s in leg_steps
+        ]
         
-        return {
+        directions = {
             'polyline': route['overview_polyline']['points'],
+            'polyline_bin': _pack_polyline(route['overview_polyline']['points']),
             'distance': leg['distance']['text'],
             'duration': leg['duration']['text'],
             'steps': steps
         }
-    except Exception as e:
-        print(f"Directions error: {e}")
+        with _directions_cache_lock:
+            _directions_cache[cache_key] = directions
+        return directions
+    except Exception:
+        logger.exception("Directions error")
         return None
 
 
-def save_audio_file(content: bytes, filename: str) -> str:
-    """Save audio bytes to uploads directory and return relative path."""
+def save_audio_file(stream: BinaryIO, filename: str) -> str:
+    """Copy an audio stream to the uploads directory and return relative path.
+
+    Streams in 64 KiB chunks so a multi-megabyte recording is never
+    duplicated in memory just to be written out.
+    """
     dest = UPLOAD_DIR / filename
     with open(dest, 'wb') as f:
-        f.write(content)
+        shutil.copyfileobj(stream, f, 1 << 16)
+    return f"web/uploads/{filename}"
+
+
+async def save_audio_file_async(stream: BinaryIO, filename: str) -> str:
+    """Async variant of save_audio_file for use from the event loop.
+
+    The destination writes go through aiofiles' worker so the loop is never
+    blocked on disk; the source is the request's spooled upload, whose reads
+    are memory-backed and cheap.
+    """
+    dest = UPLOAD_DIR / filename
+    async with aiofiles.open(dest, 'wb') as f:
+        while chunk := stream.read(1 << 16):
+            await f.write(chunk)
     return f"web/uploads/{filename}"
 
 
+# Navigation-request rows are audit data, not part of the response contract,
+# so they are drained off the request path by a daemon writer thread that
+# commits in small batches (up to 32 rows or whatever arrives within 10 ms).
+_WRITE_BATCH_SIZE = 32
+_WRITE_FLUSH_INTERVAL = 0.01  # seconds
+
+_write_queue: "Queue[Dict[str, Any]]" = Queue()
+_writer_lock = threading.Lock()
+_writer_thread: Optional[threading.Thread] = None
+
+
+@dataclass
+class StoredNavigation:
+    """What store_navigation_request hands back to the route: just the row id
+    (None until the background writer has committed)."""
+    id: Optional[int] = None
+
+
+def _nav_writer():
+    while True:
+        batch = [_write_queue.get()]
+        deadline = time.monotonic() + _WRITE_FLUSH_INTERVAL
+        while len(batch) < _WRITE_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_write_queue.get(timeout=remaining))
+            except Empty:
+                break
+        try:
+            with SessionLocal() as db:
+                # One multi-row Core INSERT: no mapper/unit-of-work pass over
+                # each pending object as add_all + commit would do.
+                db.execute(insert(NavigationRequest), batch)
+                db.commit()
+        except Exception:
+            logger.exception("Navigation write error")
+
+
+def _ensure_writer():
+    global _writer_thread
+    if _writer_thread is None or not _writer_thread.is_alive():
+        with _writer_lock:
+            if _writer_thread is None or not _writer_thread.is_alive():
+                _writer_thread = threading.Thread(
+                    target=_nav_writer, daemon=True, name="nav-writer"
+                )
+                _writer_thread.start()
+
+
 def store_navigation_request(
     device_id: str,
     origin_lat: float,
@@ -222,25 +564,39 @@ def store_navigation_request(
     destination_place: Optional[str],
     destination_lat: Optional[float],
     destination_lng: Optional[float],
-    audio_path: Optional[str]
-) -> NavigationRequest:
-    """Store navigation request in database and return the record."""
-    with SessionLocal() as db:
-        req = NavigationRequest(
-            device_id=device_id,
-            origin_lat=origin_lat,
-            origin_lng=origin_lng,
-            heading=heading,
-            transcript=transcript,
-            detected_language=detected_language,
-            translated_text=translated_text,
-            destination_place=destination_place,
-            destination_lat=destination_lat,
-            destination_lng=destination_lng,
-            audio_path=audio_path
-        )
-        db.add(req)
-        db.commit()
-        db.refresh(req)
-        return req
+    audio_path: Optional[str],
+    sync: bool = False,
+) -> StoredNavigation:
+    """Store navigation request in database and return its id wrapper.
+
+    By default the row is queued for the background writer and returned with
+    id unset; pass sync=True to commit inline (tests, scripts).
+    """
+    values = dict(
+        device_id=device_id,
+        origin_lat=origin_lat,
+        origin_lng=origin_lng,
+        heading=heading,
+        transcript=transcript,
+        detected_language=detected_language,
+        translated_text=translated_text,
+        destination_place=destination_place,
+        destination_lat=destination_lat,
+        destination_lng=destination_lng,
+        audio_path=audio_path,
+    )
+    if sync:
+        # Core INSERT ... RETURNING id: one statement instead of the ORM's
+        # add/commit plus the refresh SELECT, for a row we never read back.
+        with SessionLocal() as db:
+            row_id = db.execute(
+                insert(NavigationRequest)
+                .values(values)
+                .returning(NavigationRequest.id)
+            ).scalar_one()
+            db.commit()
+        return StoredNavigation(id=row_id)
+    _ensure_writer()
+    _write_queue.put(values)
+    return StoredNavigation()
 
@@ -0,0 +1,21 @@
+from app.services import extract_place_name
+
+
+def test_extracts_place_from_command():
+    assert extract_place_name("take me to Dhaka University") == "Dhaka University"
+
+
+def test_strips_trailing_punctuation():
+    assert extract_place_name("where is the bus station?") == "the bus station"
+
+
+def test_case_insensitive_prefix():
+    assert extract_place_name("Navigate To Central Park") == "Central Park"
+
+
+def test_falls_back_to_full_text():
+    assert extract_place_name("Dhaka University") == "Dhaka University"
+
+
+def test_empty_input():
+    assert extract_place_name("") is None